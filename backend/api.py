@@ -1,10 +1,13 @@
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from cachetools import TTLCache, cached
 from fastapi import FastAPI, HTTPException
-import psycopg2
-import json
-import requests
+from fastapi.responses import ORJSONResponse, Response
+from psycopg2.pool import ThreadedConnectionPool
 from pydantic import BaseModel
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 DB_NAME = "recipes_beta_1"
 DB_USER = "niks"
@@ -24,26 +27,68 @@ class UserPreferences(BaseModel):
     meal_type: str = ""
     num_meals: int = 1
 
+class _RecipePool(ThreadedConnectionPool):
+    def _connect(self, key=None):
+        # Prepare the recipe page query once per connection instead of re-planning it per request
+        conn = super()._connect(key)
+        with conn.cursor() as cur:
+            cur.execute("PREPARE get_recipes_limit(int) AS SELECT data::text FROM recipes LIMIT $1")
+            # Same page, keeping only the requested top-level keys of each recipe;
+            # data is cast so the projection works whether the column is json or jsonb
+            cur.execute(
+                "PREPARE get_recipe_fields_limit(text[], int) AS "
+                "SELECT COALESCE((SELECT jsonb_object_agg(key, value) FROM jsonb_each(data::jsonb) "
+                "WHERE key = ANY($1)), '{}'::jsonb)::text FROM recipes LIMIT $2"
+            )
+        conn.commit()
+        return conn
+
+# Shared pool so requests reuse connections instead of reconnecting each time. Created
+# on first use, so the service starts (and serves its docs) while Postgres is down.
+_pg_pool: Optional[_RecipePool] = None
+_pg_pool_lock = threading.Lock()
+
+def _get_pg_pool() -> _RecipePool:
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _pg_pool = _RecipePool(
+                    2, 20, dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT
+                )
+    return _pg_pool
+
+@contextmanager
 def get_db_connection():
-    conn = psycopg2.connect(
-        dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT
-    )
-    return conn
+    pool = _get_pg_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        # Drop connections the server closed on us instead of handing them out again
+        pool.putconn(conn, close=bool(conn.closed))
+
+# Cached per limit; clients only ever ask for a handful of page sizes
+@cached(cache=TTLCache(maxsize=32, ttl=300), lock=threading.Lock())
+def fetch_recipes(limit: int, fields: tuple = ()) -> str:
+    # Select the JSONB as text so psycopg2 never decodes it; we only pass it through
+    with get_db_connection() as conn, conn.cursor() as cur:
+        if fields:
+            cur.execute("EXECUTE get_recipe_fields_limit(%s, %s);", (list(fields), limit))
+        else:
+            cur.execute("EXECUTE get_recipes_limit(%s);", (limit,))
+        rows = cur.fetchall()
+    return "[" + ",".join(row[0] for row in rows) + "]"
 
 @app.get("/recipes")
-def read_recipes(limit: int = 30):
-    conn = get_db_connection()
-    cur = conn.cursor()
+def read_recipes(limit: int = 30, fields: Optional[str] = None):
+    # ?fields=name,ingredients projects each recipe server-side so callers skip filtering
+    field_names = tuple(sorted({f.strip() for f in fields.split(",") if f.strip()})) if fields else ()
     try:
-        cur.execute("SELECT data FROM recipes LIMIT %s;", (limit,))
-        rows = cur.fetchall()
-        recipes = [row[0] for row in rows]
-        return {"recipes": recipes}
+        body = '{"recipes":' + fetch_recipes(limit, field_names) + "}"
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
 # @app.post("/generate_recipe_with_gemini")
 # async def generate_recipe_with_gemini(preferences: UserPreferences):
@@ -0,0 +1,40 @@
+"""
+One-off setup for the recipes database: creates the indexes the MCP server's
+queries rely on. Run once per database (it is safe to re-run) with an account
+that has DDL rights:
+
+    python create_recipe_indexes.py
+
+Uses the same PG_* environment variables as fastmcp_main.py.
+"""
+
+import os
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_RECIPE_INDEXES = (
+    # Expression index backing the category filter on prompt recipe lookups
+    "CREATE INDEX IF NOT EXISTS recipes_category_idx ON recipes ((data->>'category'));",
+)
+
+def create_recipe_indexes():
+    conn = psycopg2.connect(
+        host=os.getenv("PG_HOST", "localhost"),
+        port=os.getenv("PG_PORT", "5432"),
+        dbname=os.getenv("PG_DB", "recipes_beta_1"),
+        user=os.getenv("PG_USER", "niks"),
+        password=os.getenv("PG_PASS", "NiksforAIMPDB*19"),
+    )
+    try:
+        with conn.cursor() as cursor:
+            for statement in _RECIPE_INDEXES:
+                cursor.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    create_recipe_indexes()
+    print("Recipe indexes created")
@@ -1,45 +1,53 @@
 import sqlite3
-import json
+import threading
 
 DATABASE_URL = "temp_grocery_list.db"
 
+# One connection per thread, opened on first use and kept for the thread's lifetime
+_tls = threading.local()
+
+def _connect():
+    conn = sqlite3.connect(DATABASE_URL, check_same_thread=False)
+    # WAL lets readers run alongside the writer; it is stored in the file header
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def _conn():
+    conn = getattr(_tls, "conn", None)
+    if conn is None:
+        conn = _tls.conn = _connect()
+    return conn
+
 def create_table():
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS grocery_lists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT NOT NULL,
-            list_data TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def insert_grocery_list(session_id: str, grocery_list: list):
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    list_data_json = json.dumps(grocery_list)
-    cursor.execute("INSERT INTO grocery_lists (session_id, list_data) VALUES (?, ?)", (session_id, list_data_json))
-    conn.commit()
-    conn.close()
+    # The connection context manager commits on success and rolls back on error
+    with _conn() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS grocery_lists (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                list_data BLOB NOT NULL
+            )
+        """)
+
+# Lists are stored as the JSON bytes the API serves, so reads need no decoding
+def insert_grocery_list(session_id: str, list_data: bytes):
+    with _conn() as conn:
+        conn.execute("INSERT INTO grocery_lists (session_id, list_data) VALUES (?, ?)", (session_id, list_data))
 
 def get_grocery_list(session_id: str):
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    cursor.execute("SELECT list_data FROM grocery_lists WHERE session_id = ?", (session_id,))
+    cursor = _conn().execute("SELECT list_data FROM grocery_lists WHERE session_id = ?", (session_id,))
     result = cursor.fetchone()
-    conn.close()
     if result:
-        return json.loads(result[0])
+        # Rows written before the switch to BLOB hold JSON text
+        data = result[0]
+        return data.encode() if isinstance(data, str) else data
     return None
 
 def delete_grocery_list(session_id: str):
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM grocery_lists WHERE session_id = ?", (session_id,))
-    conn.commit()
-    conn.close()
+    with _conn() as conn:
+        conn.execute("DELETE FROM grocery_lists WHERE session_id = ?", (session_id,))
 
 # Ensure the table is created when the module is imported
 create_table()
@@ -1,17 +1,25 @@
+import asyncio
+import copy
+import itertools
 import os
 import logging
-import json
-import re
-from typing import List
-from pydantic import BaseModel, Field
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from cachetools import TTLCache, cached
+from pydantic import BaseModel, Field, TypeAdapter
 from fastmcp import FastMCP
 from dotenv import load_dotenv
-import psycopg2
-import psycopg2.extras
+import orjson
+from psycopg2.pool import ThreadedConnectionPool
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core.exceptions import ResourceExhausted
 from fastapi import FastAPI, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 # Load environment variables
 load_dotenv()
@@ -20,16 +28,76 @@ genai.configure(api_key=GEMINI_API_KEY)
 
 # Setup logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s %(levelname)s %(name)s %(message)s",
 )
 logger = logging.getLogger("MealPlannerMCP")
 
+# Postgres connection settings, read once at import
+_PG_KW = dict(
+    host=os.getenv("PG_HOST", "localhost"),
+    port=os.getenv("PG_PORT", "5432"),
+    dbname=os.getenv("PG_DB", "recipes_beta_1"),
+    user=os.getenv("PG_USER", "niks"),
+    password=os.getenv("PG_PASS", "NiksforAIMPDB*19"),
+)
+
+_PROMPT_RECIPE_SELECT = (
+    "SELECT jsonb_build_object("
+    "'name', data->'name', 'ingredients', data->'ingredients'"
+    ")::text FROM recipes"
+)
+
+# Prepared once per pooled connection so Postgres skips parsing/planning on each call
+_PREPARED_STATEMENTS = (
+    "PREPARE get_recipes_limit(int) AS SELECT data::text FROM recipes LIMIT $1",
+    f"PREPARE get_prompt_recipes(int) AS {_PROMPT_RECIPE_SELECT} LIMIT $1",
+    f"PREPARE get_prompt_recipes_by_category(text, int) AS {_PROMPT_RECIPE_SELECT}"
+    " WHERE data->>'category' = $1 LIMIT $2",
+)
+
+class _RecipePool(ThreadedConnectionPool):
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        with conn.cursor() as cursor:
+            for statement in _PREPARED_STATEMENTS:
+                cursor.execute(statement)
+        conn.commit()
+        return conn
+
+# Postgres connection pool, shared by all recipe lookups. Created on first use, so the
+# server starts while Postgres is down.
+_pg_pool: Optional[_RecipePool] = None
+_pg_pool_lock = threading.Lock()
+
+def _get_pg_pool() -> _RecipePool:
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _pg_pool = _RecipePool(2, 20, **_PG_KW)
+    return _pg_pool
+
+@contextmanager
+def get_db_connection():
+    pool = _get_pg_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        # Discard connections closed by the server rather than returning them to the pool
+        pool.putconn(conn, close=bool(conn.closed))
+
 # Initialize FastMCP
 mcp = FastMCP("MealPlannerMCP")
 
 # Initialize FastAPI app
-app = FastAPI(docs_url="/docs", redoc_url="/redoc", openapi_url="/openapi.json")
+app = FastAPI(
+    docs_url="/docs",
+    redoc_url="/redoc",
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse,
+)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -57,6 +125,157 @@ class DayMeal(BaseModel):
 class MealPlanResponse(BaseModel):
     meal_plan: List[DayMeal]
 
+class GroceryItem(BaseModel):
+    item: str
+    quantity: str
+    category: str
+
+class MealPlanWithGroceriesResponse(BaseModel):
+    meal_plan: List[DayMeal]
+    grocery_list: List[GroceryItem]
+
+# Validates Gemini's JSON text directly in pydantic-core, without an intermediate dict
+_MEAL_PLAN_ADAPTER = TypeAdapter(MealPlanResponse)
+_PLAN_AND_GROCERIES_ADAPTER = TypeAdapter(MealPlanWithGroceriesResponse)
+
+# Structured output: Gemini returns JSON matching MealPlanResponse, no fences to strip
+MEAL_PLAN_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=MealPlanResponse,
+)
+
+# Built once; GenerativeModel holds no per-request state
+_PRO_MODEL = genai.GenerativeModel("gemini-2.5-pro", generation_config=MEAL_PLAN_GENERATION_CONFIG)
+_PRO_PLAN_AND_GROCERIES_MODEL = genai.GenerativeModel(
+    "gemini-2.5-pro",
+    generation_config=genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=MealPlanWithGroceriesResponse,
+    ),
+)
+
+# Upper bound on a single Gemini generation before the call is abandoned (for streams,
+# on the wait for each chunk). Time spent queued for a rate limit slot does not count.
+_GEMINI_TIMEOUT = 120
+
+# Client-side throttling so bursts queue here instead of turning into 429 storms
+_GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+_GEMINI_MAX_CONCURRENCY = 4
+_GEMINI_MAX_TRIES = 4
+_GEMINI_BASE_BACKOFF = 1.0
+
+class _TokenBucket:
+    """Async token bucket refilled at `rate` tokens per `period` seconds"""
+
+    def __init__(self, rate: int, period: float):
+        self._capacity = rate
+        self._tokens = float(rate)
+        self._refill_per_sec = rate / period
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._refill_per_sec)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._refill_per_sec)
+
+class _GeminiKey:
+    """One API key with its own rate limit, concurrency gate and model bindings"""
+
+    def __init__(self, api_key: Optional[str]):
+        # None means the key passed to genai.configure, used through the models as built
+        self._api_key = api_key
+        self._client = None
+        self._models = {}
+        self.bucket = _TokenBucket(_GEMINI_RPM, 60.0)
+        self.semaphore = asyncio.Semaphore(_GEMINI_MAX_CONCURRENCY)
+
+    def bind(self, model: genai.GenerativeModel) -> genai.GenerativeModel:
+        if self._api_key is None:
+            return model
+        bound = self._models.get(id(model))
+        if bound is None:
+            # Created lazily so the gRPC channel belongs to the running event loop
+            if self._client is None:
+                self._client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self._api_key})
+            # GenerativeModel has no per-instance key option, so each key gets a copy
+            # that talks through that key's client
+            bound = copy.copy(model)
+            bound._async_client = self._client
+            self._models[id(model)] = bound
+        return bound
+
+# Rate limits are per project, so keys from several projects (GEMINI_API_KEYS, comma
+# separated) are rotated round-robin, each throttled independently
+_GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+_GEMINI_KEYS = [_GeminiKey(key) for key in _GEMINI_API_KEYS] or [_GeminiKey(None)]
+# bind() relies on GenerativeModel's private _async_client; if an SDK update renamed
+# it, every call would silently go out on the default key, so refuse to start instead
+if _GEMINI_API_KEYS and not hasattr(_PRO_MODEL, "_async_client"):
+    raise RuntimeError("GEMINI_API_KEYS is not supported by this google-generativeai version")
+_GEMINI_KEY_CYCLE = itertools.cycle(_GEMINI_KEYS)
+
+# Telemetry counters for Gemini calls, readable by whatever exports metrics
+gemini_call_stats = {"calls": 0, "rate_limited": 0, "retries": 0}
+
+async def _rate_limit_backoff(attempt: int):
+    gemini_call_stats["retries"] += 1
+    delay = random.uniform(0, _GEMINI_BASE_BACKOFF * 2 ** attempt)
+    logger.warning("Gemini rate limited, retrying in %.2fs", delay)
+    await asyncio.sleep(delay)
+
+async def _generate_content(model: genai.GenerativeModel, prompt: str):
+    # Rate-limited, concurrency-bounded Gemini call; 429s are retried with full-jitter
+    # backoff, each attempt on the next key in the pool
+    for attempt in range(_GEMINI_MAX_TRIES):
+        key = next(_GEMINI_KEY_CYCLE)
+        await key.bucket.acquire()
+        async with key.semaphore:
+            gemini_call_stats["calls"] += 1
+            try:
+                return await asyncio.wait_for(
+                    key.bind(model).generate_content_async(prompt), timeout=_GEMINI_TIMEOUT
+                )
+            except ResourceExhausted:
+                gemini_call_stats["rate_limited"] += 1
+                if attempt == _GEMINI_MAX_TRIES - 1:
+                    raise
+        await _rate_limit_backoff(attempt)
+
+async def _stream_content(model: genai.GenerativeModel, prompt: str):
+    # Streaming counterpart of _generate_content: yields text chunks and holds the
+    # concurrency slot until the stream is drained. A 429 is retried only while
+    # nothing has been yielded, since a partial stream cannot be replayed.
+    for attempt in range(_GEMINI_MAX_TRIES):
+        key = next(_GEMINI_KEY_CYCLE)
+        await key.bucket.acquire()
+        yielded = False
+        async with key.semaphore:
+            gemini_call_stats["calls"] += 1
+            try:
+                response = await asyncio.wait_for(
+                    key.bind(model).generate_content_async(prompt, stream=True), timeout=_GEMINI_TIMEOUT
+                )
+                chunks = aiter(response)
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), timeout=_GEMINI_TIMEOUT)
+                    except StopAsyncIteration:
+                        return
+                    yielded = True
+                    yield chunk.text
+            except ResourceExhausted:
+                gemini_call_stats["rate_limited"] += 1
+                if yielded or attempt == _GEMINI_MAX_TRIES - 1:
+                    raise
+        await _rate_limit_backoff(attempt)
+
 # Activity multipliers
 activity_multipliers = {
     "sedentary": 1.2,
@@ -65,63 +284,90 @@ activity_multipliers = {
     "active": 1.725,
     "very active": 1.9,
 }
+# Casefolded once at import so each lookup is a single dict hit
+_ACTIVITY_MULTIPLIERS = {level.casefold(): mult for level, mult in activity_multipliers.items()}
 
 # --- Plain Python core functions ---
 
 def calc_calories(heightFeet: int, heightInches: int, weight: int, activityLevel: str) -> int:
-    logger.info(f"Calculating calories needed: {heightFeet}ft {heightInches}in, {weight}lbs, activity: {activityLevel}")
+    logger.debug(
+        "Calculating calories needed: %sft %sin, %slbs, activity: %s",
+        heightFeet, heightInches, weight, activityLevel,
+    )
     height_cm = (heightFeet * 12 + heightInches) * 2.54
     weight_kg = weight * 0.453592
     bmr = 10 * weight_kg + 6.25 * height_cm - 5 * 30 + 5  # assuming male, age=30
-    multiplier = activity_multipliers.get(activityLevel.lower(), 1.2)
+    multiplier = _ACTIVITY_MULTIPLIERS.get(activityLevel.casefold(), 1.2)
     calories = int(bmr * multiplier)
-    logger.info(f"Calculated calories: {calories}")
+    logger.debug("Calculated calories: %s", calories)
     return calories
 
-def fetch_recipes(limit: int) -> List[dict]:
-    logger.info(f"Fetching {limit} recipes from Postgres")
-    PG_HOST = os.getenv("PG_HOST", "localhost")
-    PG_PORT = os.getenv("PG_PORT", "5432")
-    PG_DB = os.getenv("PG_DB", "recipes_beta_1")
-    PG_USER = os.getenv("PG_USER", "niks")
-    PG_PASS = os.getenv("PG_PASS", "NiksforAIMPDB*19")
-
-    with psycopg2.connect(
-        host=PG_HOST,
-        port=PG_PORT,
-        dbname=PG_DB,
-        user=PG_USER,
-        password=PG_PASS,
-    ) as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute("SELECT data FROM recipes LIMIT %s;", (limit,))
+def _json_array(rows) -> str:
+    return "[" + ",".join(row[0] for row in rows) + "]"
+
+# Recipes rarely change, so repeated limits are served from memory for a few minutes
+@cached(cache=TTLCache(maxsize=32, ttl=300), lock=threading.Lock())
+def fetch_recipes(limit: int) -> str:
+    logger.debug("Fetching %d recipes from Postgres", limit)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            # Selects data::text, skipping decoding the JSONB into dicts only to re-encode it later
+            cursor.execute("EXECUTE get_recipes_limit(%s);", (limit,))
             rows = cursor.fetchall()
-    recipes = [row["data"] for row in rows]
-    logger.info(f"Fetched {len(recipes)} recipes")
-    return recipes
+    logger.debug("Fetched %d recipes", len(rows))
+    return _json_array(rows)
 
-def generate_meal_plan_plain(health_data: HealthData, days: int, recipes: List[dict]) -> MealPlanResponse:
-    logger.info(f"Generating meal plan for {days} days with health data: {health_data}")
-    calories = calc_calories(
-        health_data.heightFeet,
-        health_data.heightInches,
-        health_data.weight,
-        health_data.activityLevel,
-    )
+@cached(cache=TTLCache(maxsize=32, ttl=300), lock=threading.Lock())
+def fetch_prompt_recipes(limit: int, meal_type: Optional[str] = None) -> str:
+    # Only the fields the prompt uses, so far fewer tokens are sent to Gemini
+    logger.debug("Fetching %d prompt recipes (meal_type=%s) from Postgres", limit, meal_type)
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            if meal_type:
+                cursor.execute("EXECUTE get_prompt_recipes_by_category(%s, %s);", (meal_type, limit))
+            else:
+                cursor.execute("EXECUTE get_prompt_recipes(%s);", (limit,))
+            rows = cursor.fetchall()
+    logger.debug("Fetched %d prompt recipes", len(rows))
+    return _json_array(rows)
 
-    prompt = f"""
-You are a nutritionist AI. Create a balanced meal plan for {days} days.
+# Meal plan prompt, parsed once; only the placeholders are filled per request.
+# Static instructions come first and the per-user values last, so repeated calls
+# share a long common prefix that Gemini's implicit caching can reuse.
+_MEAL_PLAN_PROMPT_TEMPLATE = """
+You are a nutritionist AI. Create a balanced meal plan for the user described below.
+
+Return JSON in this structure:
+{{
+  "meal_plan": [
+    {{
+      "day": "Monday",
+      "breakfast": "...",
+      "lunch": "...",
+      "dinner": "...",
+      "snacks": "..."
+    }}
+  ]
+}}
+
+Available recipes (JSON format):
+{recipes_json}
+
+Number of days: {days}
 
 User health data:
-- Height: {health_data.heightFeet}ft {health_data.heightInches}in
-- Weight: {health_data.weight} lbs
-- Activity level: {health_data.activityLevel}
+- Height: {height_feet}ft {height_inches}in
+- Weight: {weight} lbs
+- Activity level: {activity_level}
 - Estimated daily calories: {calories}
+"""
 
-Available recipes (JSON format):
-{recipes}
+# Same inputs as the meal plan prompt, but asks for the grocery list in the same response
+_MEAL_PLAN_AND_GROCERIES_PROMPT_TEMPLATE = """
+You are a nutritionist AI. Create a balanced meal plan for the user described below,
+then a consolidated grocery list covering every ingredient the plan needs.
 
-Return JSON only, no markdown fencing, in this structure:
+Return JSON in this structure:
 {{
   "meal_plan": [
     {{
@@ -131,26 +377,165 @@ Return JSON only, no markdown fencing, in this structure:
       "dinner": "...",
       "snacks": "..."
     }}
+  ],
+  "grocery_list": [
+    {{
+      "item": "Chicken Breast",
+      "quantity": "2 lbs",
+      "category": "Protein"
+    }}
   ]
 }}
+
+Available recipes (JSON format):
+{recipes_json}
+
+Number of days: {days}
+
+User health data:
+- Height: {height_feet}ft {height_inches}in
+- Weight: {weight} lbs
+- Activity level: {activity_level}
+- Estimated daily calories: {calories}
 """
 
-    logger.info("Calling Gemini generative AI for meal plan...")
-    model = genai.GenerativeModel("gemini-2.5-pro")
-    response = model.generate_content(prompt)
-    content = response.text.strip()
+def _build_meal_plan_prompt(
+    health_data: HealthData,
+    days: int,
+    recipes_json: str,
+    template: str = _MEAL_PLAN_PROMPT_TEMPLATE,
+) -> str:
+    logger.debug("Generating meal plan for %d days with health data: %s", days, health_data)
+    calories = calc_calories(
+        health_data.heightFeet,
+        health_data.heightInches,
+        health_data.weight,
+        health_data.activityLevel,
+    )
 
+    return template.format(
+        days=days,
+        height_feet=health_data.heightFeet,
+        height_inches=health_data.heightInches,
+        weight=health_data.weight,
+        activity_level=health_data.activityLevel,
+        calories=calories,
+        recipes_json=recipes_json,
+    )
+
+def _parse_meal_plan(content: str) -> MealPlanResponse:
     try:
-        # Clean any backticks
-        content_clean = re.sub(r"```(json)?", "", content).strip()
-        plan_json = json.loads(content_clean)
-        meal_plan_response = MealPlanResponse.parse_obj(plan_json)
+        meal_plan_response = _MEAL_PLAN_ADAPTER.validate_json(content)
         logger.info("Meal plan generated successfully")
         return meal_plan_response
     except Exception as e:
-        logger.error(f"Failed to parse meal plan JSON: {e}")
+        logger.error("Failed to parse meal plan JSON: %s", e)
         return MealPlanResponse(meal_plan=[])
 
+def _parse_plan_and_groceries(content: str) -> MealPlanWithGroceriesResponse:
+    try:
+        return _PLAN_AND_GROCERIES_ADAPTER.validate_json(content)
+    except Exception as e:
+        logger.error("Failed to parse meal plan and grocery JSON: %s", e)
+        return MealPlanWithGroceriesResponse(meal_plan=[], grocery_list=[])
+
+# Generated plans keyed by the inputs that shape the prompt, so a repeated profile
+# (same body stats, activity level, days and recipe set) skips Gemini entirely
+_MEAL_PLAN_CACHE = TTLCache(maxsize=1024, ttl=86400)
+
+def _meal_plan_cache_key(health_data: HealthData, days: int, recipes_json: str) -> tuple:
+    return (
+        health_data.heightFeet,
+        health_data.heightInches,
+        health_data.weight,
+        health_data.activityLevel.casefold(),
+        days,
+        recipes_json,
+    )
+
+# Pre-generated plans for common profiles, written by generate_meal_plan_library.py as
+# {"recipe_limit": N, "plans": {"<bmi bucket>|<activity level>|<days>": <MealPlanResponse>}}
+# (keys like "normal|moderate|7"). When the file is absent every request goes to Gemini.
+# The plans are built from the first N unfiltered recipes, so they only stand in for
+# requests with that recipe_limit that neither filter by meal type nor supply recipes.
+_MEAL_PLAN_LIBRARY_PATH = os.getenv(
+    "MEAL_PLAN_LIBRARY", os.path.join(os.path.dirname(__file__), "meal_plans.json")
+)
+
+def _load_bucket_plans(path: str) -> tuple:
+    try:
+        with open(path, "rb") as f:
+            library = orjson.loads(f.read())
+    except FileNotFoundError:
+        return None, {}
+    plans = {}
+    for key, plan in library.get("plans", {}).items():
+        # A bad entry is skipped rather than keeping the server from starting
+        try:
+            bmi_bucket, activity_level, days = key.split("|")
+            plans[(bmi_bucket, activity_level.casefold(), int(days))] = _MEAL_PLAN_ADAPTER.validate_python(plan)
+        except ValueError as e:
+            logger.warning("Skipping meal plan library entry %r: %s", key, e)
+    logger.info("Loaded %d pre-generated meal plans", len(plans))
+    return library.get("recipe_limit"), plans
+
+_BUCKET_PLANS_RECIPE_LIMIT, _BUCKET_PLANS = _load_bucket_plans(_MEAL_PLAN_LIBRARY_PATH)
+
+def _bmi_bucket(health_data: HealthData) -> Optional[str]:
+    total_inches = health_data.heightFeet * 12 + health_data.heightInches
+    if not total_inches:
+        return None
+    bmi = 703 * health_data.weight / total_inches ** 2
+    if bmi < 18.5:
+        return "underweight"
+    if bmi < 25:
+        return "normal"
+    if bmi < 30:
+        return "overweight"
+    return "obese"
+
+def _library_meal_plan(health_data: HealthData, days: int, recipe_limit: int) -> Optional[MealPlanResponse]:
+    # Checked before any recipe fetch, so a library hit costs no database work
+    if not _BUCKET_PLANS or recipe_limit != _BUCKET_PLANS_RECIPE_LIMIT:
+        return None
+    bucket_plan = _BUCKET_PLANS.get((_bmi_bucket(health_data), health_data.activityLevel.casefold(), days))
+    if bucket_plan is not None:
+        logger.info("Meal plan served from pre-generated library")
+    return bucket_plan
+
+async def generate_meal_plan_async(health_data: HealthData, days: int, recipes_json: str) -> MealPlanResponse:
+    key = _meal_plan_cache_key(health_data, days, recipes_json)
+    cached_plan = _MEAL_PLAN_CACHE.get(key)
+    if cached_plan is not None:
+        logger.info("Meal plan served from cache")
+        return cached_plan
+
+    # Awaits Gemini instead of blocking the event loop for the whole generation
+    prompt = _build_meal_plan_prompt(health_data, days, recipes_json)
+    logger.info("Calling Gemini generative AI for meal plan...")
+    try:
+        response = await _generate_content(_PRO_MODEL, prompt)
+    except TimeoutError:
+        logger.error("Gemini meal plan generation timed out after %ds", _GEMINI_TIMEOUT)
+        return MealPlanResponse(meal_plan=[])
+    usage = response.usage_metadata
+    logger.info(
+        "Gemini prompt tokens: %d (cached: %d)",
+        usage.prompt_token_count, usage.cached_content_token_count,
+    )
+    meal_plan = _parse_meal_plan(response.text)
+    # An empty plan means parsing failed; let the next request try again
+    if meal_plan.meal_plan:
+        _MEAL_PLAN_CACHE[key] = meal_plan
+    return meal_plan
+
+async def stream_meal_plan_async(health_data: HealthData, days: int, recipes_json: str):
+    # Yields the meal plan JSON text as Gemini produces it instead of waiting for all of it
+    prompt = _build_meal_plan_prompt(health_data, days, recipes_json)
+    logger.info("Streaming Gemini generative AI meal plan...")
+    async for text in _stream_content(_PRO_MODEL, prompt):
+        yield text
+
 # --- MCP decorated wrappers ---
 
 @mcp.tool()
@@ -158,26 +543,49 @@ def calculate_calories_needed(heightFeet: int, heightInches: int, weight: int, a
     return calc_calories(heightFeet, heightInches, weight, activityLevel)
 
 @mcp.resource("recipes://{limit}")
-def get_recipes(limit: int):
-    return fetch_recipes(limit)
+async def get_recipes(limit: int):
+    return await asyncio.to_thread(fetch_recipes, limit)
 
 @mcp.prompt()
-def generate_meal_plan(health_data: HealthData, days: int, recipes: List[dict]) -> MealPlanResponse:
-    return generate_meal_plan_plain(health_data, days, recipes)
+async def generate_meal_plan(health_data: HealthData, days: int, recipes: List[dict]) -> MealPlanResponse:
+    return await generate_meal_plan_async(health_data, days, orjson.dumps(recipes).decode())
 
 # MCP function to run whole flow (optional)
 @mcp.tool()
-def full_meal_plan_flow(health_data: HealthData, days: int, recipe_limit: int):
+async def full_meal_plan_flow(health_data: HealthData, days: int, recipe_limit: int, meal_type: Optional[str] = None):
     calories = calculate_calories_needed(
         health_data.heightFeet,
         health_data.heightInches,
         health_data.weight,
         health_data.activityLevel,
     )
-    recipes = get_recipes(recipe_limit)
-    meal_plan = generate_meal_plan(health_data, days, recipes)
+    if meal_type is None:
+        library_plan = _library_meal_plan(health_data, days, recipe_limit)
+        if library_plan is not None:
+            return library_plan
+    recipes_json = await asyncio.to_thread(fetch_prompt_recipes, recipe_limit, meal_type)
+    meal_plan = await generate_meal_plan_async(health_data, days, recipes_json)
     return meal_plan
 
+# One structured generation returns both the plan and its groceries, instead of a
+# meal plan call followed by a second grocery extraction call
+@mcp.tool()
+async def generate_meal_plan_and_grocery(
+    health_data: HealthData,
+    days: int,
+    recipe_limit: int,
+    meal_type: Optional[str] = None,
+) -> MealPlanWithGroceriesResponse:
+    recipes_json = await asyncio.to_thread(fetch_prompt_recipes, recipe_limit, meal_type)
+    prompt = _build_meal_plan_prompt(health_data, days, recipes_json, _MEAL_PLAN_AND_GROCERIES_PROMPT_TEMPLATE)
+    logger.info("Calling Gemini generative AI for meal plan and grocery list...")
+    try:
+        response = await _generate_content(_PRO_PLAN_AND_GROCERIES_MODEL, prompt)
+    except TimeoutError:
+        logger.error("Gemini meal plan and grocery generation timed out after %ds", _GEMINI_TIMEOUT)
+        return MealPlanWithGroceriesResponse(meal_plan=[], grocery_list=[])
+    return _parse_plan_and_groceries(response.text)
+
 # --- FastAPI endpoints ---
 
 from fastapi import HTTPException
@@ -190,6 +598,7 @@ async def mealplan_endpoint(
     activityLevel: str = Body(...),
     days: int = Body(...),
     recipe_limit: int = Body(10),
+    meal_type: Optional[str] = Body(None),
 ):
     health_data = HealthData(
         heightFeet=heightFeet,
@@ -197,14 +606,41 @@ async def mealplan_endpoint(
         weight=weight,
         activityLevel=activityLevel,
     )
-    recipes = fetch_recipes(recipe_limit)
-    result = generate_meal_plan_plain(health_data, days, recipes)
-    return JSONResponse(content=result.dict())
+    meal_plan = _library_meal_plan(health_data, days, recipe_limit) if meal_type is None else None
+    if meal_plan is None:
+        # psycopg2 blocks, so run the lookup in a worker thread to keep the event loop free
+        recipes_json = await asyncio.to_thread(fetch_prompt_recipes, recipe_limit, meal_type)
+        meal_plan = await generate_meal_plan_async(health_data, days, recipes_json)
+    # Already validated when parsed; serialize in pydantic-core rather than via jsonable_encoder
+    return Response(content=meal_plan.model_dump_json(), media_type="application/json")
+
+@app.post("/mealplan/stream")
+async def mealplan_stream_endpoint(
+    heightFeet: int = Body(...),
+    heightInches: int = Body(...),
+    weight: int = Body(...),
+    activityLevel: str = Body(...),
+    days: int = Body(...),
+    recipe_limit: int = Body(10),
+    meal_type: Optional[str] = Body(None),
+):
+    health_data = HealthData(
+        heightFeet=heightFeet,
+        heightInches=heightInches,
+        weight=weight,
+        activityLevel=activityLevel,
+    )
+    recipes_json = await asyncio.to_thread(fetch_prompt_recipes, recipe_limit, meal_type)
+    return StreamingResponse(
+        stream_meal_plan_async(health_data, days, recipes_json),
+        media_type="application/json",
+    )
 
 @app.get("/recipes/{limit}")
 async def recipes_endpoint(limit: int):
-    recipes = fetch_recipes(limit)
-    return JSONResponse(content={"recipes": recipes})
+    # Recipes are already JSON text, so splice them into the body without re-encoding
+    body = '{"recipes":' + await asyncio.to_thread(fetch_recipes, limit) + "}"
+    return Response(content=body, media_type="application/json")
 
 if __name__ == "__main__":
     logger.info("Starting MealPlannerMCP server...")
@@ -0,0 +1,65 @@
+"""
+One-off generator for the MCP server's pre-generated meal plan library.
+
+Runs Gemini once per (BMI bucket, activity level, days) combination, using a
+representative profile for each bucket, and writes the results to the file
+fastmcp_main.py loads at startup (meal_plans.json, or MEAL_PLAN_LIBRARY):
+
+    python generate_meal_plan_library.py --days 7 --recipe-limit 10
+
+Re-run it whenever the recipes table changes; restart the server to pick it up.
+"""
+
+import argparse
+import asyncio
+import orjson
+
+from fastmcp_main import (
+    HealthData,
+    _MEAL_PLAN_LIBRARY_PATH,
+    activity_multipliers,
+    fetch_prompt_recipes,
+    generate_meal_plan_async,
+)
+
+# Representative BMI per bucket, applied to a 5'9" profile
+_BUCKET_BMIS = {
+    "underweight": 17.0,
+    "normal": 22.0,
+    "overweight": 27.5,
+    "obese": 33.0,
+}
+_HEIGHT_FEET, _HEIGHT_INCHES = 5, 9
+
+def _profile(bmi: float, activity_level: str) -> HealthData:
+    total_inches = _HEIGHT_FEET * 12 + _HEIGHT_INCHES
+    return HealthData(
+        heightFeet=_HEIGHT_FEET,
+        heightInches=_HEIGHT_INCHES,
+        weight=round(bmi * total_inches ** 2 / 703),
+        activityLevel=activity_level,
+    )
+
+async def build_library(days_options: list, recipe_limit: int) -> dict:
+    recipes_json = await asyncio.to_thread(fetch_prompt_recipes, recipe_limit)
+    plans = {}
+    for bucket, bmi in _BUCKET_BMIS.items():
+        for activity_level in activity_multipliers:
+            for days in days_options:
+                meal_plan = await generate_meal_plan_async(_profile(bmi, activity_level), days, recipes_json)
+                # An empty plan means generation failed; leave the bucket to Gemini at request time
+                if meal_plan.meal_plan:
+                    plans[f"{bucket}|{activity_level}|{days}"] = meal_plan.model_dump()
+    return {"recipe_limit": recipe_limit, "plans": plans}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[7])
+    parser.add_argument("--recipe-limit", type=int, default=10)
+    parser.add_argument("--output", default=_MEAL_PLAN_LIBRARY_PATH)
+    args = parser.parse_args()
+
+    library = asyncio.run(build_library(args.days, args.recipe_limit))
+    with open(args.output, "wb") as f:
+        f.write(orjson.dumps(library, option=orjson.OPT_INDENT_2))
+    print(f"Wrote {len(library['plans'])} meal plans to {args.output}")
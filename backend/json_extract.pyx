@@ -0,0 +1,47 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled helper for pulling the JSON object out of an AI response.
+
+Built by setup.py alongside main.py; when the extension has not been compiled,
+main.py falls back to json.JSONDecoder.raw_decode from the first brace, which
+picks the same object.
+"""
+
+
+cpdef bytes extract_outer_object(bytes data):
+    """
+    Return the first balanced {...} object in `data`, or b"" if there is none.
+
+    Single pass over the buffer tracking brace depth, skipping braces that
+    appear inside JSON strings.
+    """
+    cdef const unsigned char* buf = data
+    cdef Py_ssize_t n = len(data)
+    cdef Py_ssize_t i
+    cdef Py_ssize_t start = -1
+    cdef int depth = 0
+    cdef bint in_string = False
+    cdef bint escaped = False
+    cdef unsigned char c
+
+    for i in range(n):
+        c = buf[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == b'\\':
+                escaped = True
+            elif c == b'"':
+                in_string = False
+        elif c == b'"':
+            if start != -1:
+                in_string = True
+        elif c == b'{':
+            if start == -1:
+                start = i
+            depth += 1
+        elif c == b'}' and start != -1:
+            depth -= 1
+            if depth == 0:
+                return data[start:i + 1]
+    return b""
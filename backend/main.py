@@ -10,21 +10,52 @@ User Flow:
 5. User can retrieve or delete stored grocery lists
 """
 
+import asyncio
+import functools
+import hashlib
 import json
 import os
 import logging
-import uuid
-from typing import List, Dict, Any, Optional
+import secrets
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import TYPE_CHECKING, List, Deque, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
-import threading
 
 # Third-party imports
-import google.generativeai as genai
-import requests
+import httpx
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+# Fast JSON (orjson) when installed, with a stdlib fallback for dev environments without the wheel
+try:
+    import orjson
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    json_dumps_bytes = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+
+    def json_dumps(obj: Any) -> str:
+        return json.dumps(obj)
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    json_loads = json.loads
+
+# The Gemini SDK pulls in a large dependency tree (grpc, protobuf), so it is only
+# imported when the model is first built; see get_gemini_model
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 # Local imports
 import database
@@ -32,22 +63,17 @@ import database
 # Load environment variables from .env file
 load_dotenv()
 
-# In-memory cache for recipes, thread-safe
-global recipes_cache 
-global recipes_cache_lock 
-global session_id 
-recipes_cache = {}
-recipes_cache_lock = threading.Lock()
-session_id = str(uuid.uuid4())
-
-
 # Configure logging for debugging and monitoring
+# LOG_LEVEL=WARNING in production skips formatting the per-request INFO records
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Shared HTTP client so upstream calls reuse keep-alive connections; closed on shutdown
+HTTP_CLIENT = httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_keepalive_connections=32))
+
 # ============================================================================
 # PYDANTIC MODELS - Define data structures for API requests/responses
 # ============================================================================
@@ -57,20 +83,13 @@ class HealthData(BaseModel):
     Model for user health information input.
     Used to calculate personalized meal plans based on user's physical characteristics.
     """
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     heightFeet: int = Field(..., ge=3, le=8, description="Height in feet (3-8)")
     heightInches: int = Field(..., ge=0, le=11, description="Height in inches (0-11)")
     weight: int = Field(..., ge=50, le=500, description="Weight in pounds (50-500)")
     activityLevel: str = Field(..., description="Activity level: sedentary, lightly_active, moderately_active, very_active, extra_active")
     days: int = Field(7, ge=1, le=14, description="Number of days for meal plan")
-    
-    # unnecessary
-    # @validator('activityLevel')
-    # def validate_activity_level(cls, v):
-    #     """Ensure activity level is one of the accepted values"""
-    #     valid_levels = ['sedentary', 'lightly_active', 'moderately_active', 'very_active', 'extra_active']
-    #     if v not in valid_levels:
-    #         raise ValueError(f'Activity level must be one of: {", ".join(valid_levels)}')
-    #     return v
 
 class DayMeal(BaseModel):
     """Model for a single day's meal plan"""
@@ -102,20 +121,150 @@ class GroceryListResponse(BaseModel):
     session_id: str = Field(..., description="Unique session identifier")
     created_at: datetime = Field(default_factory=datetime.now, description="When the grocery list was created")
 
+class PlanAndGroceriesResponse(BaseModel):
+    """Model for combined meal plan and grocery list API response"""
+    meal_plan: List[DayMeal] = Field(..., description="List of daily meal plans")
+    grocery_list: List[GroceryItem] = Field(..., description="List of grocery items")
+    session_id: str = Field(..., description="Unique session identifier")
+    created_at: datetime = Field(default_factory=datetime.now, description="When the plan and list were created")
+
+# Shapes Gemini's output is constrained to (structured output), one per prompt kind.
+# Fields carry no defaults: the SDK passes a schema "default" through to Gemini's
+# Schema proto, which rejects it.
+class GroceryItemOutput(BaseModel):
+    """Model for a grocery item as generated by the AI"""
+    item: str
+    quantity: str
+    category: str
+    link: Optional[str]
+    protein: str
+    carbs: str
+    fats: str
+    calories: str
+
+class MealPlanOutput(BaseModel):
+    """Model for the AI output of a meal plan prompt"""
+    meal_plan: List[DayMeal]
+
+class GroceryListOutput(BaseModel):
+    """Model for the AI output of a grocery list prompt"""
+    grocery_list: List[GroceryItemOutput]
+
+class PlanAndGroceriesOutput(BaseModel):
+    """Model for the AI output of a combined meal plan and grocery list prompt"""
+    meal_plan: List[DayMeal]
+    grocery_list: List[GroceryItemOutput]
+
 class MealPlanInput(BaseModel):
     """Model for accepting meal plan data to extract grocery list"""
+    model_config = ConfigDict(extra="ignore")  # Accept but discard additional fields
+
     meal_plan: List[Dict[str, Any]] = Field(..., description="Meal plan data")
-    
-    class Config:
-        extra = "allow"  # Allow additional fields that might be present
+
+# ============================================================================
+# PROMPT TEMPLATES - Static prompt text, built once at import
+# ============================================================================
+
+# Only the profile lines and the embedded JSON change between requests; the
+# surrounding instructions are joined around them instead of rebuilt per call.
+# Prompts are ordered static text first, then the recipe list (stable for its TTL),
+# then the per-request part, so consecutive prompts share the longest possible
+# prefix for Gemini's prefix caching.
+_MEAL_PROMPT_HEAD = """
+        You are a meal planning assistant. Here is a list of available recipes:
+        """
+
+# Shared pieces, joined into the prompt tails below so the meal plan, grocery and
+# combined prompts cannot drift apart
+_MEAL_GUIDELINES = """
+        Guidelines:
+        1. Use only the provided recipes.
+        2. Ensure meals are balanced with proper macronutrients.
+        3. Reuse ingredients across days to minimize waste and cost.
+        4. Consider food expiration dates when planning.
+        5. Include variety while being practical.
+"""
+
+_GROCERY_INSTRUCTIONS = """
+        1. Extract all unique ingredients needed for the entire meal plan
+        2. Consolidate quantities using standard US grocery units (lbs, oz, cups, items)
+        3. Categorize items (Produce, Protein, Dairy & Alternatives, Pantry, Beverages)
+        4. For each item, provide nutritional information per typical serving
+        5. Do not include store links (they cannot be verified)
+"""
+
+_JSON_STRUCTURE_HEAD = """
+        Return ONLY a valid JSON object with this exact structure:
+        {
+"""
+
+_MEAL_PLAN_EXAMPLE = """          "meal_plan": [
+            {
+              "day": "Monday",
+              "breakfast": "Recipe name or description from the provided list",
+              "lunch": "Recipe name or description from the provided list",
+              "dinner": "Recipe name or description from the provided list",
+              "snacks": "Healthy snack options"
+            }
+          ]"""
+
+_GROCERY_LIST_EXAMPLE = """          "grocery_list": [
+            {
+              "item": "Chicken Breast",
+              "quantity": "2 lbs",
+              "category": "Protein",
+              "link": null,
+              "protein": "25g",
+              "carbs": "0g",
+              "fats": "3g",
+              "calories": "165"
+            }
+          ]"""
+
+_JSON_STRUCTURE_TAIL = """
+        }
+
+        Do not include any markdown formatting, explanations, or text outside the JSON.
+        """
+
+_MEAL_PROMPT_TAIL = "".join((
+    _MEAL_GUIDELINES, _JSON_STRUCTURE_HEAD, _MEAL_PLAN_EXAMPLE, _JSON_STRUCTURE_TAIL
+))
+
+_GROCERY_PROMPT_HEAD = """
+        You are creating a comprehensive grocery list for a meal plan.
+        
+        Recipes used by the meal plan, with their ingredients:
+        """
+
+_GROCERY_PROMPT_TAIL = "".join((
+    "\n        Instructions:", _GROCERY_INSTRUCTIONS,
+    _JSON_STRUCTURE_HEAD, _GROCERY_LIST_EXAMPLE, _JSON_STRUCTURE_TAIL,
+))
+
+_GROCERY_PROMPT_PLAN = """
+        
+        Analyze this meal plan and create the grocery list:
+        
+        """
+
+# Combined request: the meal plan guidelines plus the grocery instructions, so one
+# generation returns both objects
+_PLAN_AND_GROCERIES_PROMPT_TAIL = "".join((
+    _MEAL_GUIDELINES,
+    "\n        Then create a grocery list for the meal plan:", _GROCERY_INSTRUCTIONS,
+    _JSON_STRUCTURE_HEAD, _MEAL_PLAN_EXAMPLE, ",\n", _GROCERY_LIST_EXAMPLE, _JSON_STRUCTURE_TAIL,
+))
 
 # ============================================================================
 # UTILITY FUNCTIONS - Helper functions for AI integration and data processing
 # ============================================================================
 
+@functools.lru_cache(maxsize=1)
 def get_gemini_model():
     """
     Initialize and return Google Gemini AI model instance.
+    Built on first call and reused afterwards, so the SDK is configured once per process.
     
     Returns:
         GenerativeModel: Configured Gemini model for text generation
@@ -129,19 +278,32 @@ def get_gemini_model():
         logger.error("Gemini API key not found in environment variables")
         raise ValueError("Gemini API key not found. Please set the GEMINI_API_KEY environment variable.")
     
+    import google.generativeai as genai
+    
     # Configure the Gemini API with the provided key
     genai.configure(api_key=api_key)
     
     # Return the flash model (faster, suitable for meal planning tasks)
     return genai.GenerativeModel('gemini-1.5-flash')
 
-def safe_json_parse(text: str, expected_key: str, max_retries: int = 2) -> dict:
+# Compiled single-pass object extractor (see json_extract.pyx / setup.py), if built
+try:
+    from json_extract import extract_outer_object
+except ImportError:
+    extract_outer_object = None
+
+# Fallback when the extension is not built: decodes from the first opening brace and
+# stops at the end of that object, so it picks the same object as extract_outer_object.
+# Markdown code fences the model sometimes adds lie outside it, so need no stripping.
+_JSON_DECODER = json.JSONDecoder()
+
+def safe_json_parse(text: Union[str, bytes], expected_keys: Tuple[str, ...], max_retries: int = 2) -> dict:
     """
     Safely parse JSON from AI response with retry logic.
     
     Args:
-        text: Raw text response from AI
-        expected_key: The key that should be present in the JSON root
+        text: Raw response from AI, as text or UTF-8 bytes
+        expected_keys: The keys that must all be present in the JSON root
         max_retries: Maximum number of correction attempts
         
     Returns:
@@ -150,32 +312,67 @@ def safe_json_parse(text: str, expected_key: str, max_retries: int = 2) -> dict:
     Raises:
         ValueError: If JSON parsing fails after all retries
     """
-    # First attempt: Clean and parse the response
-    cleaned_text = text.strip().replace('```json', '').replace('```', '')
+    # The JSON parser works on bytes
+    raw = text.encode() if isinstance(text, str) else text
     
-    # Try to extract JSON object from the text
-    json_start = cleaned_text.find('{')
-    json_end = cleaned_text.rfind('}')
+    # Optimistic path: most responses are exactly one JSON object and need no cleanup
+    try:
+        parsed_json = json_loads(raw)
+    except json.JSONDecodeError:
+        parsed_json = None
     
-    if json_start != -1 and json_end != -1:
-        json_text = cleaned_text[json_start:json_end + 1]
-        
+    if not isinstance(parsed_json, dict):
+        # Strip leading and trailing prose (or code fences) around the object
         try:
-            # Attempt to parse the JSON
-            parsed_json = json.loads(json_text)
-            
-            # Validate that expected key exists
-            if expected_key in parsed_json:
-                logger.info(f"Successfully parsed JSON with key '{expected_key}'")
-                return parsed_json
+            if extract_outer_object is not None:
+                # One scan yields exactly the first balanced object
+                candidate = extract_outer_object(raw)
+                parsed_json = json_loads(candidate) if candidate else None
             else:
-                logger.warning(f"Expected key '{expected_key}' not found in JSON")
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing failed: {e}")
-            
+                decoded = raw.decode()
+                start = decoded.find("{")
+                parsed_json = _JSON_DECODER.raw_decode(decoded, start)[0] if start != -1 else None
+        except ValueError as e:
+            logger.error("JSON parsing failed: %s", e)
+    
+    # Validate that every expected key exists
+    if isinstance(parsed_json, dict):
+        missing = [key for key in expected_keys if key not in parsed_json]
+        if not missing:
+            logger.debug("Successfully parsed JSON with keys %s", expected_keys)
+            return parsed_json
+        logger.warning("Expected keys %s not found in JSON", missing)
+    
     # If we reach here, parsing failed
-    raise ValueError(f"Failed to parse valid JSON with expected key '{expected_key}'")
+    raise ValueError(f"Failed to parse valid JSON with expected keys {list(expected_keys)}")
+
+# Validators for each top-level section of AI output, built once from the same models
+# the responses are described with, so the checked shape cannot drift from them
+_RESPONSE_VALIDATORS = {
+    "meal_plan": TypeAdapter(List[DayMeal]),
+    "grocery_list": TypeAdapter(List[GroceryItem]),
+}
+
+def validate_ai_response(parsed: dict) -> None:
+    """
+    Check each known top-level section of parsed AI output against its schema.
+    
+    Raises:
+        ValueError: If a section does not have the expected shape (pydantic's
+            ValidationError is a ValueError)
+    """
+    for key, adapter in _RESPONSE_VALIDATORS.items():
+        if key in parsed:
+            adapter.validate_python(parsed[key])
+
+# Activity level multipliers (built once at import rather than on every call)
+_ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'lightly_active': 1.375,
+    'moderately_active': 1.55,
+    'very_active': 1.725,
+    'extra_active': 1.9
+}
 
 def calculate_calories_needed(height_feet: int, height_inches: int, weight: int, activity_level: str) -> int:
     """
@@ -190,61 +387,291 @@ def calculate_calories_needed(height_feet: int, height_inches: int, weight: int,
     Returns:
         int: Estimated daily calories needed
     """
-    # Convert height to total inches, then to centimeters
     total_inches = (height_feet * 12) + height_inches
-    height_cm = total_inches * 2.54
-    
-    # Convert weight to kilograms
-    weight_kg = weight * 0.453592
     
     # Assume average age of 30 and male for baseline calculation
-    # BMR = 10 * weight(kg) + 6.25 * height(cm) - 5 * age + 5
-    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * 30 + 5
-    
-    # Activity level multipliers
-    activity_multipliers = {
-        'sedentary': 1.2,
-        'lightly_active': 1.375,
-        'moderately_active': 1.55,
-        'very_active': 1.725,
-        'extra_active': 1.9
-    }
+    # BMR = 10 * weight(kg) + 6.25 * height(cm) - 5 * age + 5, with the unit
+    # conversions folded in: 10 * 0.453592 lb->kg, 6.25 * 2.54 in->cm, -5 * 30 + 5
+    bmr = 4.53592 * weight + 15.875 * total_inches - 145.0
     
     # Calculate total daily energy expenditure
-    multiplier = activity_multipliers.get(activity_level, 1.55)
+    multiplier = _ACTIVITY_MULTIPLIERS.get(activity_level, 1.55)
     daily_calories = int(bmr * multiplier)
     
-    logger.info(f"Calculated daily calories needed: {daily_calories}")
+    logger.debug("Calculated daily calories needed: %s", daily_calories)
     return daily_calories
 
-def get_mcp_completion(prompt: str, model: str = "gemini-1.5-flash", max_tokens: int = 1024) -> str:
+# Only the per-user fields are filled in per request; the static prompt text lives in
+# the module-level _*_PROMPT_* constants above
+_PROFILE_PROMPT_TEMPLATE = (
+    "\n\n        Create a personalized {days}-day meal plan for a person with the following profile:\n"
+    "        - Height: {height_feet} feet, {height_inches} inches\n"
+    "        - Weight: {weight} lbs\n"
+    "        - Activity Level: {activity_level}\n"
+    "        - Estimated Daily Calories: {calories}\n"
+)
+
+def build_profile_prompt(data: HealthData) -> str:
     """
-    Send a prompt to the local MCP server and return the generated text.
+    Build the per-user section of the meal plan prompt, including estimated daily calories.
+    """
+    daily_calories = calculate_calories_needed(
+        data.heightFeet,
+        data.heightInches,
+        data.weight,
+        data.activityLevel
+    )
+    return _PROFILE_PROMPT_TEMPLATE.format(
+        days=data.days,
+        height_feet=data.heightFeet,
+        height_inches=data.heightInches,
+        weight=data.weight,
+        activity_level=data.activityLevel.replace('_', ' '),
+        calories=daily_calories,
+    )
+
+# Give up on a streamed completion if no JSON object has started within this many bytes
+_AI_JSON_PREFIX_BYTES = 1024
+
+# Structured output: Gemini decodes straight to JSON of the given shape, so replies
+# parse on the first try instead of needing cleanup or another generation
+MEAL_PLAN_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": MealPlanOutput}
+GROCERY_LIST_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": GroceryListOutput}
+PLAN_AND_GROCERIES_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": PlanAndGroceriesOutput}
+
+# Gemini model built once at startup and shared by all requests
+AI_MODEL: Optional["genai.GenerativeModel"] = None
+
+# Cap on concurrent Gemini generations. Requests beyond it wait here rather than
+# piling more in-flight streams onto a slow or rate-limited upstream.
+_AI_MAX_CONCURRENCY = 32
+_ai_semaphore = asyncio.Semaphore(_AI_MAX_CONCURRENCY)
+
+async def stream_ai_completion(prompt: str, generation_config: Optional[dict] = None):
+    """
+    Yield Gemini's output for `prompt` as UTF-8 bytes, chunk by chunk as it is generated.
+    
+    Gemini is called in-process rather than through the local MCP server, which
+    only forwarded the prompt and added an HTTP hop and a JSON round-trip.
+    """
+    async with _ai_semaphore:
+        response = await AI_MODEL.generate_content_async(
+            prompt, generation_config=generation_config, stream=True
+        )
+        async for chunk in response:
+            yield chunk.text.encode()
+
+async def get_ai_completion(prompt: str, generation_config: Optional[dict] = None) -> bytes:
+    """
+    Send a prompt to Gemini and return the generated text as UTF-8 bytes.
+    
+    The completion is streamed and collected while generation is still running,
+    so it is ready for the JSON parser as soon as the stream ends, and output
+    that clearly is not JSON fails fast instead of waiting out the full generation.
     """
-    mcp_url = "http://localhost:8001/v1/completions"  # MCP server endpoint (adjust port if needed)
-    payload = {
-        "model": model,
-        "prompt": prompt,
-        "parameters": {"max_tokens": max_tokens}
-    }
     try:
-        response = requests.post(mcp_url, json=payload, timeout=60)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["text"]
+        completion = bytearray()
+        seen_brace = False
+        # Closed explicitly so bailing out early releases the semaphore and the
+        # Gemini stream at once rather than when the generator is collected
+        async with aclosing(stream_ai_completion(prompt, generation_config)) as stream:
+            async for data in stream:
+                completion += data
+                seen_brace = seen_brace or b"{" in data
+                if len(completion) >= _AI_JSON_PREFIX_BYTES and not seen_brace:
+                    raise ValueError("AI completion does not contain a JSON object")
+        return bytes(completion)
     except Exception as e:
-        logger.error(f"MCP completion error: {e}")
-        raise HTTPException(status_code=500, detail=f"MCP server error: {str(e)}")
+        logger.exception("AI completion error")
+        raise HTTPException(status_code=500, detail=f"AI model error: {str(e)}")
+
+# Optionally race the prompt against a strict-JSON restatement of it and keep whichever
+# parses first. Off by default, since it doubles the tokens spent per generation.
+SPECULATIVE_COMPLETIONS = os.getenv("SPECULATIVE_COMPLETIONS", "").lower() in ("1", "true", "yes")
+
+_STRICT_JSON_SUFFIX = """
+        Your entire reply must be a single strictly valid JSON object: double-quoted keys
+        and strings, no trailing commas, no comments, nothing before or after it.
+        """
+
+async def _complete_and_parse(
+    prompt: str, expected_keys: Tuple[str, ...], generation_config: Optional[dict]
+) -> dict:
+    parsed = safe_json_parse(await get_ai_completion(prompt, generation_config), expected_keys)
+    validate_ai_response(parsed)
+    return parsed
+
+async def _generate_parsed(
+    prompt: str, expected_keys: Tuple[str, ...], generation_config: Optional[dict]
+) -> dict:
+    """
+    Generate and parse a completion, speculatively in parallel when enabled.
+    """
+    if not SPECULATIVE_COMPLETIONS:
+        return await _complete_and_parse(prompt, expected_keys, generation_config)
+    
+    tasks = [
+        asyncio.create_task(_complete_and_parse(p, expected_keys, generation_config))
+        for p in (prompt, prompt + _STRICT_JSON_SUFFIX)
+    ]
+    try:
+        error: Optional[Exception] = None
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                return await next_done
+            except Exception as e:
+                error = e
+        raise error
+    finally:
+        # The slower generation is no longer needed
+        for task in tasks:
+            task.cancel()
+
+# Parsed AI responses keyed by a hash of the prompt. The prompt embeds the user
+# profile (or meal plan) and the recipe list, so identical requests reuse the
+# earlier answer instead of paying for another multi-second generation.
+_completion_cache: TTLCache = TTLCache(maxsize=1024, ttl=86400)
+
+# Stop storing answers while recent prompts rarely repeat. The rate is measured over a
+# sliding window of lookups against the keys of recently seen prompts, which are tracked
+# even while storing is off, so the cache turns itself back on once repeats return.
+_COMPLETION_CACHE_WINDOW = 200
+_COMPLETION_CACHE_MIN_HIT_RATE = 0.05
+_completion_cache_window: Deque[bool] = deque(maxlen=_COMPLETION_CACHE_WINDOW)
+_completion_keys_seen: TTLCache = TTLCache(maxsize=8192, ttl=86400)
+
+def completion_cache_hit_rate() -> float:
+    """Fraction of recent completion lookups whose prompt had been seen before."""
+    window = _completion_cache_window
+    return sum(window) / len(window) if window else 0.0
+
+def _completion_cache_enabled() -> bool:
+    return (
+        len(_completion_cache_window) < _COMPLETION_CACHE_WINDOW
+        or completion_cache_hit_rate() >= _COMPLETION_CACHE_MIN_HIT_RATE
+    )
+
+def _completion_key(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+
+def _completion_cache_get(prompt: str) -> Tuple[Optional[bytes], Optional[dict]]:
+    """
+    Look `prompt` up in the completion cache, recording whether it was seen before.
+    
+    Returns:
+        tuple: (key, cached parse or None). The key is None while storing is
+        disabled, in which case the caller's result should not be stored.
+    """
+    key = _completion_key(prompt)
+    seen = key in _completion_keys_seen
+    _completion_keys_seen[key] = True
+    _completion_cache_window.append(seen)
+    cached = _completion_cache.get(key) if seen else None
+    return (key if _completion_cache_enabled() else None), cached
+
+def _completion_cache_put(key: Optional[bytes], parsed: dict) -> None:
+    if key is not None:
+        _completion_cache[key] = parsed
+
+async def get_parsed_completion(
+    prompt: str, expected_keys: Tuple[str, ...], generation_config: Optional[dict] = None
+) -> dict:
+    """
+    Return the AI response for `prompt` parsed as JSON, reusing a cached answer when possible.
+    
+    Only responses that parse and contain every key in `expected_keys` are cached.
+    """
+    key, cached = _completion_cache_get(prompt)
+    if cached is not None:
+        return cached
+    
+    parsed = await _generate_parsed(prompt, expected_keys, generation_config)
+    _completion_cache_put(key, parsed)
+    return parsed
+
+# Recipe list is quasi-static: fetched at most once per TTL and shared by all requests.
+# It is cached already serialized, since its only use is being embedded in prompts.
+_recipes_cache: Optional[tuple] = None  # (fetched_at, recipes_json)
+_recipes_cache_lock = asyncio.Lock()
+
+# After a failed fetch, report the recipes service as down for this many seconds
+# instead of letting every request wait on it again
+_RECIPES_RETRY_AFTER = 5.0
+_recipes_down_until = 0.0
+
+async def get_recipes_json(ttl: float = 60) -> str:
+    """
+    Return available recipes from the /recipes service as JSON text, cached for `ttl` seconds.
+    
+    Returns:
+        str: JSON array of recipes trimmed to the name, ingredients and id used in prompts
+    """
+    global _recipes_cache, _recipes_down_until
+    if _recipes_cache is not None and time.monotonic() - _recipes_cache[0] < ttl:
+        return _recipes_cache[1]
+    
+    async with _recipes_cache_lock:
+        # Another request may have refreshed the cache while we waited for the lock
+        if _recipes_cache is not None and time.monotonic() - _recipes_cache[0] < ttl:
+            return _recipes_cache[1]
+        
+        if time.monotonic() < _recipes_down_until:
+            raise HTTPException(status_code=503, detail="Recipes service unavailable")
+        
+        # The recipes service projects the fields for us, so there is nothing to filter here.
+        # It runs on localhost, so a connection that is not made almost at once is not coming.
+        try:
+            recipes_response = await HTTP_CLIENT.get(
+                "http://localhost:8002/recipes",
+                params={"limit": 50, "fields": "name,ingredients,id"},
+                timeout=httpx.Timeout(10, connect=0.5),
+            )
+            recipes_response.raise_for_status()
+        except httpx.HTTPError as e:
+            _recipes_down_until = time.monotonic() + _RECIPES_RETRY_AFTER
+            logger.error("Recipes service error: %s", e)
+            raise HTTPException(status_code=503, detail="Recipes service unavailable")
+        recipes_json = json_dumps(json_loads(recipes_response.content).get("recipes", []))
+        _recipes_cache = (time.monotonic(), recipes_json)
+        return recipes_json
+
+# Grocery lists whose database write is still queued as a background task,
+# so a GET that races the write can still be answered
+_pending_grocery_lists: Dict[str, bytes] = {}
+
+# Grocery lists never change once created, so GETs are served from memory after the
+# first read. Like the pending map and the database, it holds the JSON-encoded bytes.
+# Entries are dropped on DELETE; the TTL bounds how long memory is held.
+_grocery_list_cache: TTLCache = TTLCache(maxsize=4096, ttl=300)
+
+# Bumped when a DELETE finishes. A GET whose database read (done off the event loop)
+# overlapped a DELETE must not put the deleted list back in the cache.
+_grocery_list_deletes = 0
+
+def store_grocery_list(session_id: str, list_data: bytes) -> None:
+    """
+    Persist a grocery list, then drop it from the pending map.
+    Runs as a background task after the create response has been sent.
+    """
+    database.insert_grocery_list(session_id, list_data)
+    # If a DELETE arrived while the write was queued it already removed the
+    # pending entry; undo the write so the list does not come back
+    if _pending_grocery_lists.pop(session_id, None) is None:
+        database.delete_grocery_list(session_id)
 
 # ============================================================================
 # FASTAPI APPLICATION SETUP
 # ============================================================================
 
+# Serialize responses with orjson when it is installed (see the JSON helpers above)
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
 # Initialize FastAPI application
 app = FastAPI(
     title="Walmart Meal Planner API",
     description="Generate personalized meal plans and grocery lists using AI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultJSONResponse
 )
 
 # Add CORS middleware to allow frontend connections
@@ -256,14 +683,6 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# ============================================================================
-# DEPENDENCY INJECTION - Shared dependencies for endpoints
-# ============================================================================
-
-def get_ai_model():
-    """Dependency to provide AI model instance to endpoints"""
-    return get_gemini_model()
-
 # ============================================================================
 # API ENDPOINTS - Core application functionality
 # ============================================================================
@@ -277,7 +696,8 @@ async def root():
     return {
         "message": "Walmart Meal Planner API",
         "version": "1.0.0",
-        "status": "healthy"
+        "status": "healthy",
+        "completion_cache_hit_rate": round(completion_cache_hit_rate(), 3)
     }
 
 # @app.get("/health")
@@ -310,93 +730,116 @@ async def root():
 async def generate_meal_plan(
     data: HealthData
 ):
-    logger.info(f"Generating meal plan for user: height={data.heightFeet}'{data.heightInches}", weight={data.weight}lbs, activity={data.activityLevel})
+    logger.info(
+        "Generating meal plan for user: height=%d'%d\", weight=%dlbs, activity=%s",
+        data.heightFeet, data.heightInches, data.weight, data.activityLevel,
+    )
+    
+    # Fail fast while the AI model is unavailable, before any recipe fetch or prompt work
+    if AI_MODEL is None:
+        raise HTTPException(status_code=503, detail="AI model not initialized")
     
     try:
-        # Calculate estimated daily calorie needs
-        daily_calories = calculate_calories_needed(
-            data.heightFeet,
-            data.heightInches,
-            data.weight,
-            data.activityLevel
-        )
+        # Profile lines, including estimated daily calorie needs
+        profile = build_profile_prompt(data)
 
-
-        # Fetch recipes from the /recipes endpoint
-        recipes_response = requests.get("http://localhost:8002/recipes?limit=50", timeout=10)
-        recipes_response.raise_for_status()
-        
-        # recipes_data = recipes_response.json().get("recipes", [])
-        recipes_data = [
-            {
-                "name": r.get("name"),
-                "ingredients": r.get("ingredients"),
-                "id": r.get("id")
-            }
-            for r in recipes_response.json().get("recipes", [])
-        ]
-
-        with recipes_cache_lock:
-            recipes_cache[session_id] = recipes_data
+        # Fetch available recipes (cached across requests)
+        recipes_json = await get_recipes_json()
 
         # Create detailed prompt for AI meal plan generation, including recipes
-        prompt = f"""
-        You are a meal planning assistant. Here is a list of available recipes:
-        {json.dumps(recipes_data, indent=2)}
-
-        Create a personalized {data.days}-day meal plan for a person with the following profile:
-        - Height: {data.heightFeet} feet, {data.heightInches} inches
-        - Weight: {data.weight} lbs
-        - Activity Level: {data.activityLevel.replace('_', ' ')}
-        - Estimated Daily Calories: {daily_calories}
-
-        Guidelines:
-        1. Use only the provided recipes.
-        2. Ensure meals are balanced with proper macronutrients.
-        3. Reuse ingredients across days to minimize waste and cost.
-        4. Consider food expiration dates when planning.
-        5. Include variety while being practical.
-
-        Return ONLY a valid JSON object with this exact structure:
-        {{
-          "meal_plan": [
-            {{
-              "day": "Monday",
-              "breakfast": "Recipe name or description from the provided list",
-              "lunch": "Recipe name or description from the provided list", 
-              "dinner": "Recipe name or description from the provided list",
-              "snacks": "Healthy snack options"
-            }}
-          ]
-        }}
-
-        Do not include any markdown formatting, explanations, or text outside the JSON.
-        """
+        prompt = "".join((_MEAL_PROMPT_HEAD, recipes_json, _MEAL_PROMPT_TAIL, profile))
 
-        # Generate meal plan using MCP server
-        logger.info("Requesting meal plan generation from MCP server")
-        ai_response = get_mcp_completion(prompt)
-        meal_plan_data = safe_json_parse(ai_response, "meal_plan")
+        # Generate meal plan using the AI model
+        logger.info("Requesting meal plan generation from AI model")
+        meal_plan_data = await get_parsed_completion(prompt, ("meal_plan",), MEAL_PLAN_GENERATION_CONFIG)
         
-        # Validate the structure and convert to Pydantic models
-        daily_meals = [DayMeal(**day_data) for day_data in meal_plan_data["meal_plan"]]
+        daily_meals = meal_plan_data["meal_plan"]
         
-        # Create response object
-        meal_plan_response = MealPlanResponse(meal_plan=daily_meals)
+        # Return the parsed plan as-is; Pydantic stays on the request side (HealthData),
+        # so the days are not rebuilt as DayMeal models only to be serialized again
+        logger.info("Successfully generated %d-day meal plan", len(daily_meals))
+        return DefaultJSONResponse(content={
+            "meal_plan": daily_meals,
+            "generated_at": datetime.now().isoformat()
+        })
         
-        logger.info(f"Successfully generated {len(daily_meals)}-day meal plan")
-        return meal_plan_response
+    except HTTPException:
+        # Re-raise HTTP exceptions (e.g. 503 from an unavailable upstream)
+        raise
+    except Exception as e:
+        logger.exception("Error generating meal plan")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate meal plan: {str(e)}"
+        )
+
+@app.post("/mealplan/stream")
+async def stream_meal_plan(
+    data: HealthData
+):
+    """
+    Generate a meal plan and stream the JSON to the client as the AI writes it.
+    
+    Same prompt and cache as /mealplan, but the first bytes arrive as soon as
+    Gemini produces them instead of after the whole plan is generated. The body
+    is the model's raw JSON output ({"meal_plan": [...]}), without generated_at.
+    
+    Args:
+        data: User health information
         
+    Returns:
+        StreamingResponse: Meal plan JSON, streamed
+    """
+    logger.info(
+        "Streaming meal plan for user: height=%d'%d\", weight=%dlbs, activity=%s",
+        data.heightFeet, data.heightInches, data.weight, data.activityLevel,
+    )
+    
+    if AI_MODEL is None:
+        raise HTTPException(status_code=503, detail="AI model not initialized")
+    
+    profile = build_profile_prompt(data)
+    recipes_json = await get_recipes_json()
+    prompt = "".join((_MEAL_PROMPT_HEAD, recipes_json, _MEAL_PROMPT_TAIL, profile))
+    
+    key, cached = _completion_cache_get(prompt)
+    if cached is not None:
+        return Response(content=json_dumps_bytes(cached), media_type="application/json")
+    
+    # Wait for the first chunk before committing to a 200, so a failed Gemini call
+    # (auth, rate limit, timeout) is reported as an error rather than an empty body
+    stream = stream_ai_completion(prompt, MEAL_PLAN_GENERATION_CONFIG)
+    try:
+        first_chunk = await anext(stream, b"")
     except Exception as e:
-        logger.error(f"Error generating meal plan: {e}")
+        await stream.aclose()
+        logger.exception("Error generating meal plan")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate meal plan: {str(e)}"
         )
+    
+    async def body():
+        # Collect what was sent so a complete, valid plan can be cached afterwards
+        completion = bytearray(first_chunk)
+        async with aclosing(stream):
+            yield first_chunk
+            async for chunk in stream:
+                completion += chunk
+                yield chunk
+        try:
+            parsed = safe_json_parse(bytes(completion), ("meal_plan",))
+            validate_ai_response(parsed)
+            _completion_cache_put(key, parsed)
+        except ValueError as e:
+            logger.warning("Streamed meal plan not cached: %s", e)
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 @app.post("/grocery-list", response_model=GroceryListResponse)
 async def create_grocery_list(
-    meal_plan_input: MealPlanInput
+    meal_plan_input: MealPlanInput,
+    background_tasks: BackgroundTasks
 ):
     """
     Extract and organize grocery list from a meal plan.
@@ -410,90 +853,127 @@ async def create_grocery_list(
     
     Args:
         meal_plan_input: Meal plan data to extract groceries from
-        model: AI model instance (injected dependency)
+        background_tasks: Runs the database write after the response is sent
         
     Returns:
         GroceryListResponse: Organized grocery list with session ID
     """
     logger.info("Extracting grocery list from meal plan")
     
+    if AI_MODEL is None:
+        raise HTTPException(status_code=503, detail="AI model not initialized")
+    
     try:
-        # Convert meal plan to JSON string for AI processing
-        meal_plan_json = json.dumps(meal_plan_input.meal_plan, indent=2)
-                # Fetch recipes from the /recipes endpoint
-        recipes_response = requests.get("http://localhost:8002/recipes?limit=50", timeout=10)
-        recipes_response.raise_for_status()
-        
-        # recipes_data = recipes_response.json().get("recipes", [])
-        recipes_data = [
-            {
-                "name": r.get("name"),
-                "ingredients": r.get("ingredients"),
-                "id": r.get("id")
-            }
-            for r in recipes_response.json().get("recipes", [])
-        ]
+        # Convert meal plan to compact JSON for AI processing; indentation only adds prompt tokens
+        meal_plan_json = json_dumps(meal_plan_input.meal_plan)
+        # Recipe ingredients for the meals in the plan (cached across requests)
+        recipes_json = await get_recipes_json()
 
         # Create detailed prompt for grocery list extraction
-        prompt = f"""
-        Analyze this meal plan and create a comprehensive grocery list:
+        prompt = "".join((
+            _GROCERY_PROMPT_HEAD, recipes_json, _GROCERY_PROMPT_TAIL, _GROCERY_PROMPT_PLAN, meal_plan_json
+        ))
         
-        {recipes_data}
+        logger.info("Requesting grocery list extraction from AI model")
+        grocery_data = await get_parsed_completion(prompt, ("grocery_list",), GROCERY_LIST_GENERATION_CONFIG)
         
-        Instructions:
-        1. Extract all unique ingredients needed for the entire meal plan
-        2. Consolidate quantities using standard US grocery units (lbs, oz, cups, items)
-        3. Categorize items (Produce, Protein, Dairy & Alternatives, Pantry, Beverages)
-        4. For each item, provide nutritional information per typical serving
-        5. Do not include store links (they cannot be verified)
-        
-        Return ONLY a valid JSON object with this exact structure:
-        {{
-          "grocery_list": [
-            {{
-              "item": "Chicken Breast",
-              "quantity": "2 lbs",
-              "category": "Protein",
-              "link": null,
-              "protein": "25g",
-              "carbs": "0g", 
-              "fats": "3g",
-              "calories": "165"
-            }}
-          ]
-        }}
+        grocery_list = grocery_data["grocery_list"]
         
-        Do not include any markdown formatting, explanations, or text outside the JSON.
-        """
+        # Generate unique session ID for storing the grocery list
+        session_id = secrets.token_hex(16)
         
-        logger.info("Requesting grocery list extraction from MCP server")
-        ai_response = get_mcp_completion(prompt)
-        grocery_data = safe_json_parse(ai_response, "grocery_list")
+        # Store grocery list in database with session ID once the response is out;
+        # until then GET requests are served from the pending map
+        logger.info("Storing grocery list with session ID: %s", session_id)
+        # Encoded once here; GETs return these bytes without touching JSON again
+        list_data = json_dumps_bytes(grocery_data)
+        _pending_grocery_lists[session_id] = list_data
+        background_tasks.add_task(store_grocery_list, session_id, list_data)
         
-        # Validate and convert to Pydantic models
-        grocery_items = [GroceryItem(**item_data) for item_data in grocery_data["grocery_list"]]
+        # Encode the parsed items directly instead of rebuilding them as GroceryItem
+        # models and having FastAPI walk them again through jsonable_encoder
+        logger.info("Successfully created grocery list with %d items", len(grocery_list))
+        return DefaultJSONResponse(content={
+            "grocery_list": grocery_list,
+            "session_id": session_id,
+            "created_at": datetime.now().isoformat()
+        })
         
-        # Generate unique session ID for storing the grocery list
-        session_id = str(uuid.uuid4())
+    except HTTPException:
+        # Re-raise HTTP exceptions (e.g. 503 from an unavailable upstream)
+        raise
+    except Exception as e:
+        logger.exception("Error creating grocery list")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create grocery list: {str(e)}"
+        )
+
+@app.post("/plan-and-groceries", response_model=PlanAndGroceriesResponse)
+async def generate_plan_and_groceries(
+    data: HealthData,
+    background_tasks: BackgroundTasks
+):
+    """
+    Generate a meal plan and its grocery list with a single AI request.
+    
+    User Flow:
+    1. User submits health data
+    2. AI creates the meal plan and extracts its grocery list in one response
+    3. System generates session ID and stores both
+    4. Returns the meal plan, grocery list and session ID
+    
+    Args:
+        data: User health information
+        background_tasks: Runs the database write after the response is sent
         
-        # Store grocery list in database with session ID
-        logger.info(f"Storing grocery list with session ID: {session_id}")
-        database.insert_grocery_list(session_id, grocery_data)
+    Returns:
+        PlanAndGroceriesResponse: Meal plan and grocery list with session ID
+    """
+    logger.info(
+        "Generating meal plan and grocery list for user: height=%d'%d\", weight=%dlbs, activity=%s",
+        data.heightFeet, data.heightInches, data.weight, data.activityLevel,
+    )
+    
+    if AI_MODEL is None:
+        raise HTTPException(status_code=503, detail="AI model not initialized")
+    
+    try:
+        profile = build_profile_prompt(data)
+        recipes_json = await get_recipes_json()
+        prompt = "".join((_MEAL_PROMPT_HEAD, recipes_json, _PLAN_AND_GROCERIES_PROMPT_TAIL, profile))
         
-        # Create response object
-        grocery_response = GroceryListResponse(
-            grocery_list=grocery_items,
-            session_id=session_id
+        logger.info("Requesting meal plan and grocery list from AI model")
+        plan_data = await get_parsed_completion(
+            prompt, ("meal_plan", "grocery_list"), PLAN_AND_GROCERIES_GENERATION_CONFIG
         )
         
-        logger.info(f"Successfully created grocery list with {len(grocery_items)} items")
-        return grocery_response
+        # Both parts are stored together under one session ID
+        session_id = secrets.token_hex(16)
+        logger.info("Storing meal plan and grocery list with session ID: %s", session_id)
+        list_data = json_dumps_bytes(plan_data)
+        _pending_grocery_lists[session_id] = list_data
+        background_tasks.add_task(store_grocery_list, session_id, list_data)
+        
+        logger.info(
+            "Successfully generated %d-day meal plan with %d grocery items",
+            len(plan_data["meal_plan"]), len(plan_data["grocery_list"]),
+        )
+        return DefaultJSONResponse(content={
+            "meal_plan": plan_data["meal_plan"],
+            "grocery_list": plan_data["grocery_list"],
+            "session_id": session_id,
+            "created_at": datetime.now().isoformat()
+        })
         
+    except HTTPException:
+        # Re-raise HTTP exceptions (e.g. 503 from an unavailable upstream)
+        raise
     except Exception as e:
-        logger.error(f"Error creating grocery list: {e}")
+        logger.exception("Error generating meal plan and grocery list")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to create grocery list: {str(e)}"
+            detail=f"Failed to generate meal plan and grocery list: {str(e)}"
         )
 
 @app.get("/grocery-list/{session_id}")
@@ -512,31 +992,39 @@ async def get_grocery_list(session_id: str):
     Returns:
         dict: Grocery list data with metadata
     """
-    logger.info(f"Retrieving grocery list for session: {session_id}")
+    logger.info("Retrieving grocery list for session: %s", session_id)
     
     try:
-        # Query database for grocery list
-        grocery_list = database.get_grocery_list(session_id)
+        # Check lists still being written before querying the database
+        list_data = _grocery_list_cache.get(session_id) or _pending_grocery_lists.get(session_id)
+        if list_data is None:
+            # SQLite blocks, so read in a worker thread to keep the event loop free
+            deletes_before = _grocery_list_deletes
+            list_data = await asyncio.to_thread(database.get_grocery_list, session_id)
+            if list_data and _grocery_list_deletes == deletes_before:
+                _grocery_list_cache[session_id] = list_data
         
-        if not grocery_list:
-            logger.warning(f"Grocery list not found for session: {session_id}")
+        if not list_data:
+            logger.warning("Grocery list not found for session: %s", session_id)
             raise HTTPException(
                 status_code=404,
                 detail=f"Grocery list not found for session: {session_id}"
             )
         
-        logger.info(f"Successfully retrieved grocery list for session: {session_id}")
-        return {
-            "session_id": session_id,
-            "grocery_list": grocery_list,
-            "retrieved_at": datetime.now().isoformat()
-        }
+        logger.info("Successfully retrieved grocery list for session: %s", session_id)
+        # The stored list is already JSON; splice it into the body instead of re-encoding it
+        body = b"".join((
+            b'{"session_id":', json_dumps_bytes(session_id),
+            b',"grocery_list":', list_data,
+            b',"retrieved_at":"', datetime.now().isoformat().encode(), b'"}',
+        ))
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Error retrieving grocery list: {e}")
+        logger.exception("Error retrieving grocery list")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve grocery list: {str(e)}"
@@ -558,20 +1046,25 @@ async def delete_grocery_list(session_id: str):
     Returns:
         dict: Confirmation message
     """
-    logger.info(f"Deleting grocery list for session: {session_id}")
+    global _grocery_list_deletes
+    logger.info("Deleting grocery list for session: %s", session_id)
     
     try:
-        # Remove grocery list from database
-        database.delete_grocery_list(session_id)
+        # Remove grocery list from database (and any write still pending)
+        _pending_grocery_lists.pop(session_id, None)
+        await asyncio.to_thread(database.delete_grocery_list, session_id)
+        # Evict only once the row is gone, so no GET can re-cache it afterwards
+        _grocery_list_deletes += 1
+        _grocery_list_cache.pop(session_id, None)
         
-        logger.info(f"Successfully deleted grocery list for session: {session_id}")
-        return {
+        logger.info("Successfully deleted grocery list for session: %s", session_id)
+        return DefaultJSONResponse(content={
             "message": f"Grocery list for session {session_id} has been deleted",
             "deleted_at": datetime.now().isoformat()
-        }
+        })
         
     except Exception as e:
-        logger.error(f"Error deleting grocery list: {e}")
+        logger.exception("Error deleting grocery list")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete grocery list: {str(e)}"
@@ -590,18 +1083,19 @@ async def startup_event():
     logger.info("Starting Walmart Meal Planner API...")
     
     try:
-        # Test AI model initialization
-        model = get_gemini_model()
-        logger.info("✓ AI model initialized successfully")
+        # Initialize the shared AI model
+        global AI_MODEL
+        AI_MODEL = get_gemini_model()
+        logger.info("AI model initialized successfully")
         
         # Test database connection (if applicable)
         # database.test_connection()
-        logger.info("✓ Database connection verified")
+        logger.info("Database connection verified")
         
-        logger.info("🚀 Meal Planner API startup complete")
+        logger.info("Meal Planner API startup complete")
         
     except Exception as e:
-        logger.error(f"❌ Startup failed: {e}")
+        logger.error("Startup failed: %s", e)
         raise
 
 @app.on_event("shutdown")
@@ -610,8 +1104,8 @@ async def shutdown_event():
     Cleanup resources on application shutdown.
     """
     logger.info("Shutting down Meal Planner API...")
-    # Add any cleanup logic here
-    logger.info("✓ Shutdown complete")
+    await HTTP_CLIENT.aclose()
+    logger.info("Shutdown complete")
 
 # ============================================================================
 # MAIN EXECUTION
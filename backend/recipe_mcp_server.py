@@ -5,10 +5,13 @@ MCP-compliant AI Model Server (FastAPI)
 - Returns response in MCP format
 """
 
+import functools
 import os
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from typing import List, Optional
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from dotenv import load_dotenv
 import google.generativeai as genai
 import logging
@@ -16,58 +19,96 @@ import logging
 # Load environment variables (for GEMINI_API_KEY)
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger("recipe_mcp_server")
 
-app = FastAPI(title="MCP-compliant AI Model Server")
+app = FastAPI(title="MCP-compliant AI Model Server", default_response_class=ORJSONResponse)
 
 # Request schema for /v1/completions
 class CompletionRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     model: str
     prompt: str
     parameters: dict = {}
+    stream: bool = False
 
 # Response schema for MCP
 class Choice(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     text: str
     index: int = 0
 
 class CompletionResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     object: str = "text_completion"
     model: str
-    choices: list
+    choices: List[Choice]
 
-# Helper to get Gemini model
+# Configure the SDK once at startup rather than on every request
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+else:
+    logger.error("GEMINI_API_KEY not set in environment.")
 
+# Helper to get Gemini model; one instance per model name, reused across requests.
+# Bounded because the name comes from the request body.
+@functools.lru_cache(maxsize=16)
 def get_gemini_model(model_name: str):
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        logger.error("GEMINI_API_KEY not set in environment.")
+    if not GEMINI_API_KEY:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set.")
-    genai.configure(api_key=api_key)
     return genai.GenerativeModel(model_name)
 
+def _generation_config(request: CompletionRequest) -> Optional[dict]:
+    # Only 'max_tokens' is supported; it caps Gemini's output when the client sets it
+    max_tokens = request.parameters.get("max_tokens")
+    return {"max_output_tokens": max_tokens} if max_tokens is not None else None
+
+async def stream_completion(model, request: CompletionRequest):
+    """
+    Yield Gemini output as OpenAI-style server-sent events, ending with [DONE].
+    """
+    response = await model.generate_content_async(
+        request.prompt, generation_config=_generation_config(request), stream=True
+    )
+    async for chunk in response:
+        frame = {
+            "id": "completion-1",
+            "object": "text_completion",
+            "model": request.model,
+            "choices": [{"text": chunk.text, "index": 0}],
+        }
+        yield b"data: " + orjson.dumps(frame) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
 @app.post("/v1/completions", response_model=CompletionResponse)
 async def completions(request: CompletionRequest):
     """
     MCP-compliant endpoint for text completions.
+    Set "stream": true to receive the completion incrementally as server-sent events.
     """
     try:
         model = get_gemini_model(request.model)
-        # Only 'prompt' and 'max_tokens' supported for simplicity
-        prompt = request.prompt
-        max_tokens = request.parameters.get("max_tokens", 512)
-        # Gemini API does not use max_tokens directly, but you can pass it if needed
-        response = model.generate_content(prompt)
-        text = response.text
-        return CompletionResponse(
-            id="completion-1",
-            model=request.model,
-            choices=[Choice(text=text, index=0).dict()]
+        if request.stream:
+            return StreamingResponse(stream_completion(model, request), media_type="text/event-stream")
+        response = await model.generate_content_async(
+            request.prompt, generation_config=_generation_config(request)
         )
+        text = response.text
+        # Same shape as CompletionResponse, returned directly so FastAPI does not
+        # validate the model and run it through jsonable_encoder again
+        return ORJSONResponse(content={
+            "id": "completion-1",
+            "object": "text_completion",
+            "model": request.model,
+            "choices": [{"text": text, "index": 0}],
+        })
     except Exception as e:
-        logger.error(f"Completion error: {e}")
+        logger.exception("Completion error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/")
@@ -0,0 +1,22 @@
+"""
+Optional Cython build for the meal planner API.
+
+    python setup.py build_ext --inplace
+
+compiles main.py into a main*.so extension next to it. Python imports the
+extension in preference to main.py, so `uvicorn main:app` picks up the
+compiled module with no code changes. It also builds json_extract.pyx, the
+JSON object extractor main.py uses when available. Requires Cython 3 and a
+C compiler.
+"""
+
+from Cython.Build import cythonize
+from setuptools import setup
+
+setup(
+    name="meal_planner_backend",
+    ext_modules=cythonize(
+        ["main.py", "json_extract.pyx"],
+        compiler_directives={"language_level": 3, "boundscheck": False},
+    ),
+)